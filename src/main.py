@@ -1,86 +1,64 @@
 import csv
 import argparse
+import heapq
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from operator import itemgetter
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Iterable, Iterator
+
+from scoring import read_rows, reason_names, score_email
 
 DEFAULT_INPUT = "data/emails.csv"
 DEFAULT_OUT = "report.csv"
 
-SUSPICIOUS_KEYWORDS = [
-    "verify", "locked", "suspended", "action required", "urgent", "payment failed",
-    "compromised", "secure", "reset", "unusual login"
-]
-
-BRAND_KEYWORDS = ["amazon", "paypal", "netflix", "apple", "bank"]
-
-
-def domain_from_email(email: str) -> str:
-    if "@" not in email:
-        return ""
-    return email.split("@", 1)[1].lower().strip()
-
-
-def domain_from_url(url: str) -> str:
-    try:
-        return urlparse(url).netloc.lower().strip()
-    except Exception:
-        return ""
-
+BATCH_SIZE = 10_000
+TOP_N = 10
 
-def score_email(row: dict) -> tuple[int, list[str]]:
-    reasons = []
-    score = 0
+REPORT_FIELDS = ["id", "sender", "subject", "links", "attachments", "score", "reasons"]
+SCORE_KEY = itemgetter(REPORT_FIELDS.index("score"))
 
-    sender = (row.get("sender") or "").lower()
-    subject = (row.get("subject") or "").lower()
-    body = (row.get("body") or "").lower()
-    links = (row.get("links") or "").strip()
-    attachments = (row.get("attachments") or "").lower().strip()
 
-    sender_domain = domain_from_email(sender)
+def score_batch(rows: list[tuple[str, ...]]) -> list[tuple]:
+    """Score a batch of INPUT_FIELDS rows and return them as REPORT_FIELDS rows."""
+    # Plain per-row loop; a batch is just the unit score_batches hands to a worker
+    report = []
+    for email_id, sender, subject, body, links, attachments in rows:
+        s, tags = score_email(sender, subject, body, links, attachments)
+        report.append((email_id, sender, subject, links, attachments, s, ";".join(reason_names(tags))))
+    return report
 
-    # Keyword scoring (subject/body)
-    text = f"{subject} {body}"
-    for kw in SUSPICIOUS_KEYWORDS:
-        if kw in text:
-            score += 2
-            reasons.append(f"keyword:{kw}")
 
-    # Link scoring
-    if links and links.lower() != "none":
-        link_domain = domain_from_url(links)
+def available_cpus() -> int:
+    # Honour CPU affinity (taskset, container cpusets) where the platform exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
-        if links.lower().startswith("http://"):
-            score += 3
-            reasons.append("link:http")
 
-        if link_domain and sender_domain and link_domain != sender_domain:
-            score += 2
-            reasons.append("link_domain_mismatch")
-
-        # Brand mismatch: brand word in sender but sender domain looks off
-        for brand in BRAND_KEYWORDS:
-            if brand in sender and brand not in sender_domain:
-                score += 3
-                reasons.append(f"brand_domain_mismatch:{brand}")
-                break
-
-        # Simple typo/lookalike hint
-        if "0" in links or ("-" in link_domain and link_domain):
-            score += 1
-            reasons.append("lookalike_hint")
-
-    # Attachment scoring
-    if attachments and attachments != "none":
-        score += 2
-        reasons.append("has_attachment")
-
-        risky = [".exe", ".js", ".vbs", ".bat", ".scr", ".zip", ".iso", ".docm", ".xlsm"]
-        if any(ext in attachments for ext in risky):
-            score += 4
-            reasons.append("risky_attachment_type")
+def score_batches(rows: Iterable[tuple[str, ...]], workers: int) -> Iterator[list[tuple]]:
+    """Yield score_batch() results for BATCH_SIZE slices of rows, in input order."""
+    rows = iter(rows)
+    # Peek one row past the first batch: an input of exactly BATCH_SIZE rows is still one batch
+    head = list(islice(rows, BATCH_SIZE + 1))
+    rows = chain(head, rows)
+    if workers <= 1 or len(head) <= BATCH_SIZE:
+        # Single batch or single worker: not worth starting processes
+        while batch := list(islice(rows, BATCH_SIZE)):
+            yield score_batch(batch)
+        return
 
-    return score, reasons
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        # Cap the batches in flight so memory stays bounded on large inputs
+        pending = deque()
+        while batch := list(islice(rows, BATCH_SIZE)):
+            pending.append(ex.submit(score_batch, batch))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def main():
@@ -88,6 +66,8 @@ def main():
     parser.add_argument("--input", default=DEFAULT_INPUT, help="Input CSV path")
     parser.add_argument("--out", default=DEFAULT_OUT, help="Output report CSV path")
     parser.add_argument("--min_score", type=int, default=0, help="Only display emails with score >= this")
+    parser.add_argument("--workers", type=int, default=available_cpus(),
+                        help="Processes used to score large inputs (1 = score in this process)")
     args = parser.parse_args()
 
     input_path = Path(args.input)
@@ -97,45 +77,33 @@ def main():
         print(f"Missing file: {input_path}")
         return
 
-    emails = []
-    with input_path.open(newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            s, reasons = score_email(row)
-            row["_score"] = s
-            row["_reasons"] = ";".join(reasons)
-            emails.append(row)
-
-    emails.sort(key=lambda r: r["_score"], reverse=True)
-
-    # Terminal output (filtered)
-    filtered = [r for r in emails if r["_score"] >= args.min_score]
+    # Score in batches and stream each one straight into the report (input order),
+    # keeping only the TOP_N highest-scoring rows for the terminal summary.
+    loaded = 0
+    shown = 0
+    top = []
+    with input_path.open(newline="", encoding="utf-8") as f_in, \
+            out_path.open("w", newline="", encoding="utf-8") as f_out:
+        w = csv.writer(f_out)
+        w.writerow(REPORT_FIELDS)
+        for scored in score_batches(read_rows(f_in), args.workers):
+            w.writerows(scored)
+            loaded += len(scored)
+            hits = [r for r in scored if SCORE_KEY(r) >= args.min_score]
+            shown += len(hits)
+            # nlargest is stable, so putting the current top first keeps earlier
+            # emails ahead of later ones with the same score
+            top = heapq.nlargest(TOP_N, top + hits, key=SCORE_KEY)
 
     print("=== Phishing Email Detector ===")
     print(f"Input: {input_path}")
-    print(f"Loaded: {len(emails)} emails")
-    print(f"Showing score >= {args.min_score}: {len(filtered)} emails\n")
+    print(f"Loaded: {loaded} emails")
+    print(f"Showing score >= {args.min_score}: {shown} emails\n")
 
     print("Top suspicious emails:")
-    for r in filtered[:10]:
-        print(f"- id={r.get('id')} score={r['_score']} sender={r.get('sender')} subject={r.get('subject')}")
-        print(f"  reasons: {r['_reasons']}\n")
-
-    # Write full results to CSV report (not filtered)
-    fieldnames = ["id", "sender", "subject", "links", "attachments", "score", "reasons"]
-    with out_path.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in emails:
-            w.writerow({
-                "id": r.get("id"),
-                "sender": r.get("sender"),
-                "subject": r.get("subject"),
-                "links": r.get("links"),
-                "attachments": r.get("attachments"),
-                "score": r["_score"],
-                "reasons": r["_reasons"],
-            })
+    for email_id, sender, subject, _links, _attachments, s, reasons in top:
+        print(f"- id={email_id} score={s} sender={sender} subject={subject}")
+        print(f"  reasons: {reasons}\n")
 
     print(f"Saved: {out_path}")
 
@@ -0,0 +1,210 @@
+"""Rule-based phishing scoring shared by the CLI (main.py) and the web UI (web.py)."""
+
+import csv
+import re
+from functools import lru_cache
+from operator import itemgetter
+from typing import Iterator
+
+INPUT_FIELDS = ["id", "sender", "subject", "body", "links", "attachments"]
+
+SUSPICIOUS_KEYWORDS = [
+    "verify", "locked", "suspended", "action required", "urgent", "payment failed",
+    "compromised", "secure", "reset", "unusual login"
+]
+
+KEYWORD_WEIGHT = 2
+
+BRAND_KEYWORDS = ["amazon", "paypal", "netflix", "apple", "bank"]
+
+# Every other signal is one bit in a per-email flag word
+LINK_HTTP = 1 << 0
+LINK_DOMAIN_MISMATCH = 1 << 1
+BRAND_DOMAIN_MISMATCH = 1 << 2
+LOOKALIKE_HINT = 1 << 3
+HAS_ATTACHMENT = 1 << 4
+RISKY_ATTACHMENT = 1 << 5
+
+SIGNAL_WEIGHTS = {
+    LINK_HTTP: 3,
+    LINK_DOMAIN_MISMATCH: 2,
+    BRAND_DOMAIN_MISMATCH: 3,
+    LOOKALIKE_HINT: 1,
+    HAS_ATTACHMENT: 2,
+    RISKY_ATTACHMENT: 4,
+}
+
+# SIGNAL_SCORES[flags] is the summed weight of the bits set in flags, so the
+# score comes from one table lookup rather than an addition per signal
+SIGNAL_SCORES = [
+    sum(weight for bit, weight in SIGNAL_WEIGHTS.items() if flags & bit)
+    for flags in range(1 << len(SIGNAL_WEIGHTS))
+]
+
+RISKY_EXTENSIONS = frozenset({".exe", ".js", ".vbs", ".bat", ".scr", ".zip", ".iso", ".docm", ".xlsm"})
+
+# RFC 3986 scheme: a letter, then letters, digits, "+", "-" or "."
+SCHEME_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*")
+
+# Extensions are pulled out of the attachment names once and checked against the set
+EXTENSION_RE = re.compile(r"\.[a-z0-9]{1,5}")
+
+# score_email reports reasons as int tags indexing REASON_NAMES; the text is only
+# built by reason_names() when a reason is actually shown or written out.
+# Tags are laid out in the order the reasons are reported.
+REASON_NAMES = tuple(
+    [f"keyword:{kw}" for kw in SUSPICIOUS_KEYWORDS]
+    + ["link:http", "link_domain_mismatch"]
+    + [f"brand_domain_mismatch:{brand}" for brand in BRAND_KEYWORDS]
+    + ["lookalike_hint", "has_attachment", "risky_attachment_type"]
+)
+TAG_LINK_HTTP = len(SUSPICIOUS_KEYWORDS)
+TAG_LINK_DOMAIN_MISMATCH = TAG_LINK_HTTP + 1
+TAG_BRAND_BASE = TAG_LINK_DOMAIN_MISMATCH + 1
+TAG_LOOKALIKE_HINT = TAG_BRAND_BASE + len(BRAND_KEYWORDS)
+TAG_HAS_ATTACHMENT = TAG_LOOKALIKE_HINT + 1
+TAG_RISKY_ATTACHMENT = TAG_HAS_ATTACHMENT + 1
+
+
+# Senders and links repeat heavily within a feed, so domain lookups are memoized
+@lru_cache(maxsize=4096)
+def domain_from_email(email: str) -> str:
+    if "@" not in email:
+        return ""
+    return email.split("@", 1)[1].lower().strip()
+
+
+@lru_cache(maxsize=4096)
+def domain_from_url(url: str) -> str:
+    """Return the lowercased host of url, without user info or port.
+
+    >>> domain_from_url("https://user:pw@Mail.Example.com:8443/login")
+    'mail.example.com'
+    >>> domain_from_url("http://[::1]:8080/x")
+    '[::1]'
+    >>> domain_from_url("www.example.com/go?to=http://evil.com")
+    ''
+    """
+    # Only the host is needed, so slice it out directly rather than building a
+    # full urlparse() result. Like urlparse, there is no host without "//", and
+    # "://" only counts when what precedes it is a valid scheme.
+    start = url.find("://")
+    if start != -1 and SCHEME_RE.fullmatch(url, 0, start):
+        start += 3
+    elif url.startswith("//"):
+        start = 2
+    else:
+        return ""
+    end = len(url)
+    for sep in "/?#":
+        i = url.find(sep, start, end)
+        if i != -1:
+            end = i
+    host = url[start:end]
+    host = host[host.rfind("@") + 1:]  # drop user:password@
+    if host.startswith("["):  # IPv6 literal
+        host = host[:host.find("]") + 1]
+    else:
+        host = host.partition(":")[0]  # drop :port
+    return host.lower().strip()
+
+
+def read_rows(f) -> Iterator[tuple[str, ...]]:
+    """Yield one tuple per CSV row, ordered like INPUT_FIELDS."""
+    reader = csv.reader(f)
+    header = next(reader, [])
+    width = len(header)
+    # Missing columns point at the empty cell appended to every row
+    pick = itemgetter(*(header.index(name) if name in header else width for name in INPUT_FIELDS))
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != width:
+            row = (row + [""] * width)[:width]
+        row.append("")
+        yield pick(row)
+
+
+def _build_matcher(words: list[str], first_tag: int):
+    # Word lists are fixed at import, so generate a straight-line function with one
+    # `in` test per word instead of looping over the list for every email
+    lines = ["def match(text):", "    tags = []"]
+    for tag, word in enumerate(words, first_tag):
+        lines.append(f"    if {word!r} in text: tags.append({tag})")
+    lines.append("    return tags")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["match"]
+
+
+# match_*(text) -> tags of the words found in text, in list order
+match_keywords = _build_matcher(SUSPICIOUS_KEYWORDS, 0)
+match_brands = _build_matcher(BRAND_KEYWORDS, TAG_BRAND_BASE)
+
+
+def reason_names(tags: list[int]) -> list[str]:
+    return [REASON_NAMES[tag] for tag in tags]
+
+
+def score_email(sender: str, subject: str, body: str, links: str, attachments: str) -> tuple[int, list[int]]:
+    tags = []
+    score = 0
+    flags = 0
+
+    # Lowercase every searched field in one go: sender\nsubject body\nattachments
+    blob = f"{sender}\n{subject} {body}\n{attachments}".lower()
+    sender_end = len(sender)
+    text_end = sender_end + len(subject) + len(body) + 2
+    if len(blob) != text_end + 1 + len(attachments):
+        # A few characters change length when lowercased; measure each field instead
+        sender_end = len(sender.lower())
+        text_end = sender_end + len(subject.lower()) + len(body.lower()) + 2
+
+    sender = blob[:sender_end]
+    attachments = blob[text_end + 1:].strip()
+    links = links.strip()
+    links_lower = links.lower()
+
+    sender_domain = domain_from_email(sender)
+
+    # Keyword scoring (subject/body)
+    keyword_tags = match_keywords(blob[sender_end + 1:text_end])
+    if keyword_tags:
+        # Every keyword weighs the same, so add them in one step instead of per hit
+        score += KEYWORD_WEIGHT * len(keyword_tags)
+        tags.extend(keyword_tags)
+
+    # Link scoring
+    if links and links_lower != "none":
+        link_domain = domain_from_url(links)
+
+        if links_lower.startswith("http://"):
+            flags |= LINK_HTTP
+            tags.append(TAG_LINK_HTTP)
+
+        if link_domain and sender_domain and link_domain != sender_domain:
+            flags |= LINK_DOMAIN_MISMATCH
+            tags.append(TAG_LINK_DOMAIN_MISMATCH)
+
+        # Brand mismatch: brand word in sender but sender domain looks off
+        for tag in match_brands(sender):
+            if BRAND_KEYWORDS[tag - TAG_BRAND_BASE] not in sender_domain:
+                flags |= BRAND_DOMAIN_MISMATCH
+                tags.append(tag)
+                break
+
+        # Simple typo/lookalike hint
+        if "0" in links or ("-" in link_domain and link_domain):
+            flags |= LOOKALIKE_HINT
+            tags.append(TAG_LOOKALIKE_HINT)
+
+    # Attachment scoring
+    if attachments and attachments != "none":
+        flags |= HAS_ATTACHMENT
+        tags.append(TAG_HAS_ATTACHMENT)
+
+        if not RISKY_EXTENSIONS.isdisjoint(EXTENSION_RE.findall(attachments)):
+            flags |= RISKY_ATTACHMENT
+            tags.append(TAG_RISKY_ATTACHMENT)
+
+    return score + SIGNAL_SCORES[flags], tags
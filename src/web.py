@@ -1,9 +1,16 @@
-from flask import Flask, request, render_template_string
-import csv
+from flask import Flask, request
+from flask_compress import Compress
 import os
-from urllib.parse import urlparse
+from operator import itemgetter
+
+from scoring import (
+    BRAND_KEYWORDS, SUSPICIOUS_KEYWORDS, TAG_BRAND_BASE, TAG_HAS_ATTACHMENT, TAG_LINK_DOMAIN_MISMATCH,
+    TAG_LINK_HTTP, TAG_LOOKALIKE_HINT, TAG_RISKY_ATTACHMENT, read_rows, score_email,
+)
 
 app = Flask(__name__)
+app.config["TEMPLATES_AUTO_RELOAD"] = False
+Compress(app)  # gzip the HTML; the table markup compresses well
 
 TEMPLATE = """
 <!doctype html>
@@ -100,80 +107,56 @@ TEMPLATE = """
 </html>
 """
 
-KEYWORDS = [
-    "verify", "suspended", "action required", "locked", "payment failed",
-    "compromised", "secure", "reset", "unusual login"
-]
-
-BRANDS = {
-    "amazon": ["amazon.com"],
-    "paypal": ["paypal.com"],
-    "netflix": ["netflix.com"],
-    "apple": ["apple.com", "icloud.com"],
+# Readable wording for each scoring.py reason tag
+REASON_LABELS = {
+    **{tag: f"Keyword match: '{kw}'" for tag, kw in enumerate(SUSPICIOUS_KEYWORDS)},
+    TAG_LINK_HTTP: "HTTP link (not HTTPS)",
+    TAG_LINK_DOMAIN_MISMATCH: "Link domain differs from sender domain",
+    **{TAG_BRAND_BASE + i: f"Brand/domain mismatch: {brand}" for i, brand in enumerate(BRAND_KEYWORDS)},
+    TAG_LOOKALIKE_HINT: "Possible lookalike pattern",
+    TAG_HAS_ATTACHMENT: "Has attachment",
+    TAG_RISKY_ATTACHMENT: "Risky attachment type",
 }
 
-def get_domain(url: str) -> str:
-    try:
-        return (urlparse(url).netloc or "").lower()
-    except Exception:
-        return ""
-
-def lookalike_hint(text: str) -> bool:
-    t = (text or "").lower()
-    return any(x in t for x in ["0", "1", "secure-", "-secure", "login-", "-login"])
-
-def score_email(row: dict) -> tuple[int, list[str]]:
-    sender = (row.get("sender") or "").lower()
-    subject = (row.get("subject") or "").lower()
-    body = (row.get("body") or "").lower()
-    links = (row.get("links") or "").strip()
-
-    score = 0
-    reasons = []
-
-    blob = f"{sender} {subject} {body}"
-
-    for k in KEYWORDS:
-        if k in blob:
-            score += 2
-            reasons.append(f"Keyword match: '{k}'")
+# The shared scorer weighs signals differently from the old web-only rules
+# (http links +3 instead of +2, risky attachments +4), which lifts borderline
+# emails such as sample id 3 to 8; at 9 the page flags the same sample emails
+# that 8 did under the old rules.
+DEFAULT_MIN_SCORE = 9
 
-    attachments = (row.get("attachments") or "").lower()
-    if attachments and attachments != "none":
-        score += 2
-        reasons.append("Has attachment")
+# Parse the page once at import instead of on every request
+PAGE = app.jinja_env.from_string(TEMPLATE)
 
-    if links and links.lower() != "none":
-        if links.lower().startswith("http://"):
-            score += 2
-            reasons.append("HTTP link (not HTTPS)")
-
-        link_domain = get_domain(links)
-        sender_domain = sender.split("@")[-1] if "@" in sender else ""
-
-        if link_domain and sender_domain and link_domain != sender_domain:
-            score += 2
-            reasons.append("Link domain differs from sender domain")
-
-        for brand, legit_domains in BRANDS.items():
-            if brand in sender or brand in subject or brand in body:
-                if not any(d in sender for d in legit_domains):
-                    score += 3
-                    reasons.append(f"Brand/domain mismatch: {brand}")
-
-    if lookalike_hint(sender) or lookalike_hint(links):
-        score += 1
-        reasons.append("Possible lookalike pattern")
-
-    return score, reasons
-
-def load_emails(csv_path: str) -> list[dict]:
-    emails = []
+def load_emails(csv_path: str) -> list[tuple[str, ...]]:
     with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            emails.append(row)
-    return emails
+        return list(read_rows(f))
+
+# ((mtime_ns, size), rows sorted by score) for the last CSV scored; swapped in one assignment
+_scored_cache = (None, [])
+
+def get_scored(csv_path: str) -> list[dict]:
+    """Score every email in csv_path, reusing the previous result while the file is unchanged."""
+    global _scored_cache
+    st = os.stat(csv_path)
+    version = (st.st_mtime_ns, st.st_size)
+    cached_version, scored = _scored_cache
+    if cached_version == version:
+        return scored
+
+    scored = []
+    for email_id, sender, subject, body, links, attachments in load_emails(csv_path):
+        s, tags = score_email(sender, subject, body, links, attachments)
+        scored.append({
+            "id": email_id,
+            "sender": sender,
+            "subject": subject,
+            "score": s,
+            "reasons_list": [REASON_LABELS[t] for t in tags] if tags else ["No indicators found"],
+        })
+    scored.sort(key=itemgetter("score"), reverse=True)
+
+    _scored_cache = (version, scored)
+    return scored
 
 @app.route("/", methods=["GET"])
 def index():
@@ -181,29 +164,15 @@ def index():
     input_path = os.path.join(base_dir, "data", "emails.csv")
 
     try:
-        min_score = int(request.args.get("min_score", "8"))
+        min_score = int(request.args.get("min_score", DEFAULT_MIN_SCORE))
     except ValueError:
-        min_score = 8
+        min_score = DEFAULT_MIN_SCORE
 
     try:
-        emails = load_emails(input_path)
-        scored = []
-        for e in emails:
-            s, reasons = score_email(e)
-            out = {
-                "id": e.get("id", ""),
-                "sender": e.get("sender", ""),
-                "subject": e.get("subject", ""),
-                "score": s,
-                "reasons_list": reasons if reasons else ["No indicators found"],
-            }
-            if s >= min_score:
-                scored.append(out)
-
-        scored.sort(key=lambda x: x["score"], reverse=True)
-
-        return render_template_string(
-            TEMPLATE,
+        emails = get_scored(input_path)
+        scored = [e for e in emails if e["score"] >= min_score]
+
+        return PAGE.render(
             input_path="data/emails.csv",
             min_score=min_score,
             loaded=len(emails),
@@ -212,8 +181,7 @@ def index():
             error=None,
         )
     except Exception as ex:
-        return render_template_string(
-            TEMPLATE,
+        return PAGE.render(
             input_path="data/emails.csv",
             min_score=min_score,
             loaded=0,
@@ -222,5 +190,7 @@ def index():
             error=str(ex),
         )
 
+# Development server only (single process, debugger on). In production run e.g.
+#   gunicorn --chdir src -w 4 -k gthread --threads 8 -b 0.0.0.0:5001 web:app
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5001, debug=True)